@@ -1,117 +1,172 @@
+import os
+import pickle
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING
+
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import numpy as np
 
+if TYPE_CHECKING:
+    import yfinance as yf
+
 st.set_page_config(page_title="Financial Ratio Analyzer", page_icon="📊", layout="wide")
 
+# On-disk copy of fetched data so a server restart does not mean a cold Yahoo round-trip.
+# Entries older than DISK_REFRESH_AGE are served and refreshed in the background;
+# entries older than DISK_MAX_AGE are ignored.
+DISK_CACHE_DIR = Path(__file__).resolve().parent / ".cache"
+DISK_REFRESH_AGE = 60 * 60
+DISK_MAX_AGE = 60 * 60 * 24
+
 # ========================= Caching & Helpers =========================
 # Cache the Ticker object as a resource (unpicklable). Keep data outputs cacheable with cache_data.
 @st.cache_resource
-def get_ticker(ticker: str) -> yf.Ticker:
+def get_ticker(ticker: str) -> "yf.Ticker":
+    # yfinance is slow to import; defer it until a ticker is actually requested
+    import yfinance as yf
     return yf.Ticker(ticker)
 
-@st.cache_data(ttl=60 * 30)
-def load_statements(ticker: str):
-    t = get_ticker(ticker)
-
-    inc = t.financials.transpose().copy()
-    bal = t.balance_sheet.transpose().copy()
-    cfs = t.cash_flow.transpose().copy()
+def fetch_statements(t: "yf.Ticker"):
+    """Fetch the three annual statements in parallel (each is a separate Yahoo round-trip)."""
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        futures = [
+            ex.submit(lambda: t.financials),
+            ex.submit(lambda: t.balance_sheet),
+            ex.submit(lambda: t.cash_flow),
+        ]
+        inc, bal, cfs = [f.result() for f in futures]
 
     # normalize indices to year (int)
     def norm(df: pd.DataFrame):
         if df is None or df.empty:
             return pd.DataFrame()
-        idx = pd.to_datetime(df.index, errors='coerce')
-        df = df.copy()
-        df.index = idx
-        df = df[~df.index.isna()]
-        df["Year"] = df.index.year
-        # keep most recent duplicate year
-        df = (
-            df.sort_index()
-              .drop_duplicates(subset=["Year"], keep="last")
-              .set_index("Year")
-              .sort_index()
-        )
-        return df
-
-    return norm(inc), norm(bal), norm(cfs)
+        dates = pd.to_datetime(df.index, errors='coerce')
+        valid = ~np.asarray(dates.isna())
+        dates = dates[valid]
+        # order rows by date, then keep the most recent row of each year
+        order = np.argsort(dates.asi8, kind='stable')
+        years = dates.year.to_numpy(dtype=int)[order]
+        _, last = np.unique(years[::-1], return_index=True)
+        pos = len(years) - 1 - last
+        df = df.iloc[np.flatnonzero(valid)[order[pos]]]
+        df.index = pd.Index(years[pos], name='Year')
+        # coerce every line item to float64 once so lookups downstream are plain column access
+        return df.apply(pd.to_numeric, errors='coerce').astype(float)
 
+    return norm(inc.transpose()), norm(bal.transpose()), norm(cfs.transpose())
 
-def sget(df: pd.DataFrame, col: str) -> pd.Series:
-    if df is None or df.empty or col not in df.columns:
-        return pd.Series(dtype=float)
-    s = pd.to_numeric(df[col], errors='coerce')
-    s.index.name = 'Year'
-    return s.dropna().astype(float)
 
+def disk_cache_path(ticker: str) -> Path:
+    return DISK_CACHE_DIR / (re.sub(r'[^A-Za-z0-9._^=-]', '_', ticker) + '.statements.pkl')
 
-def avg_series(current: pd.Series) -> pd.Series:
-    prev = current.shift(1)
-    return (current + prev) / 2.0
+
+def write_disk_cache(ticker: str, data) -> None:
+    inc, bal, _ = data
+    # yfinance returns empty frames when throttled; don't pin that on disk
+    if inc.empty or bal.empty:
+        return
+    path = disk_cache_path(ticker)
+    tmp = path.with_suffix(f'.{threading.get_ident()}.tmp')
+    try:
+        DISK_CACHE_DIR.mkdir(exist_ok=True)
+        tmp.write_bytes(pickle.dumps(data))
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    finally:
+        # only left behind if the write or rename failed
+        tmp.unlink(missing_ok=True)
+
+
+def refresh_disk_cache(ticker: str, t: "yf.Ticker") -> None:
+    try:
+        write_disk_cache(ticker, fetch_statements(t))
+    except Exception:
+        pass
 
 
-def safe_div(n, d) -> pd.Series:
-    """Division that gracefully handles Series/scalar combos and infs.
-    Broadcasts scalars to the other's index, returns NaN for /0.
+@st.cache_data(ttl=60 * 30)
+def load_statements(ticker: str):
+    """fetch_statements() behind a disk cache: stale entries are returned immediately and refreshed in a background thread."""
+    path = disk_cache_path(ticker)
+    try:
+        age = time.time() - path.stat().st_mtime
+    except OSError:
+        age = None
+    if age is not None and age < DISK_MAX_AGE:
+        try:
+            data = pickle.loads(path.read_bytes())
+            inc, bal, cfs = data
+        except Exception:
+            # truncated, foreign or incompatible (e.g. written by another pandas version): drop it and refetch
+            path.unlink(missing_ok=True)
+        else:
+            if age > DISK_REFRESH_AGE:
+                threading.Thread(target=refresh_disk_cache, args=(ticker, get_ticker(ticker)), daemon=True).start()
+            return data
+    data = fetch_statements(get_ticker(ticker))
+    write_disk_cache(ticker, data)
+    return data
+
+
+@st.cache_data(ttl=60 * 30)
+def load_market(ticker: str):
+    """Fetch the market inputs in parallel, only when market ratios are shown.
+    Returns (fast_info, hist, dividends). A failed fetch raises, so it is never cached.
     """
-    # Convert to Series with aligned index when one of them is a Series
-    if isinstance(n, pd.Series) and isinstance(d, pd.Series):
-        out = n / d
-    elif isinstance(n, pd.Series):  # d is scalar
-        out = n / d
-    elif isinstance(d, pd.Series):  # n is scalar -> broadcast n
-        out = pd.Series(n, index=d.index) / d
-    else:  # both scalars -> return a 1-length series
-        out = pd.Series([np.nan]) if (d == 0 or d is None) else pd.Series([n / d])
-    return out.replace([np.inf, -np.inf], np.nan)
+    t = get_ticker(ticker)
 
+    def fast_info():
+        fi = t.fast_info
+        return {k: fi.get(k) for k in ('last_price', 'last_close', 'market_cap')}
 
-# ========================= Ratio Computation =========================
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        futures = [
+            ex.submit(fast_info),
+            ex.submit(lambda: t.history(period='5d')),
+            ex.submit(lambda: t.dividends),
+        ]
+        return tuple(f.result() for f in futures)
 
-def compute_ratios(inc: pd.DataFrame, bal: pd.DataFrame):
-    # Income statement
-    rev = sget(inc, 'Total Revenue')
-    ni = sget(inc, 'Net Income')
-    ebit = sget(inc, 'EBIT')
-    int_exp = sget(inc, 'Interest Expense')
-    cogs = sget(inc, 'Cost Of Revenue')
-    gross_profit = sget(inc, 'Gross Profit')
-
-    # Balance sheet
-    cur_assets = sget(bal, 'Current Assets')
-    cur_liab = sget(bal, 'Current Liabilities')
-    cash_sti = sget(bal, 'Cash Cash Equivalents And Short Term Investments')
-    inventory = sget(bal, 'Inventory')
-    receivables = sget(bal, 'Accounts Receivable')
-    if receivables.empty:
-        receivables = sget(bal, 'Net Receivables')
-    payables = sget(bal, 'Accounts Payable')
-    total_assets = sget(bal, 'Total Assets')
-    total_debt = sget(bal, 'Total Debt')
-    total_equity = sget(bal, 'Total Equity Gross Minority Interest')
-    if total_equity.empty and 'Total Equity' in bal.columns:
-        total_equity = sget(bal, 'Total Equity')
-    if total_equity.empty and 'Total Stockholder Equity' in bal.columns:
-        total_equity = sget(bal, 'Total Stockholder Equity')
 
-    # Common aligned index across statements
-    years = sorted(
-        set(rev.index) | set(ni.index) | set(ebit.index) |
-        set(cur_assets.index) | set(cur_liab.index) |
-        set(total_assets.index) | set(total_equity.index)
-    )
+def sget(df: pd.DataFrame, col: str) -> pd.Series:
+    if df is None or df.empty or col not in df.columns:
+        return pd.Series(dtype=float)
+    return df[col].dropna()
 
-    def align(s):
-        return s.reindex(years)
 
-    rev, ni, ebit, int_exp, cogs, gross_profit = map(align, [rev, ni, ebit, int_exp, cogs, gross_profit])
-    cur_assets, cur_liab, cash_sti, inventory, receivables, payables, total_assets, total_debt, total_equity = map(
-        align, [cur_assets, cur_liab, cash_sti, inventory, receivables, payables, total_assets, total_debt, total_equity]
-    )
+def avg_series(current: np.ndarray) -> np.ndarray:
+    """Average of each year's balance with the prior year's (NaN for the first year)."""
+    out = np.empty_like(current)
+    out[:1] = np.nan
+    out[1:] = 0.5 * (current[1:] + current[:-1])
+    return out
+
 
+def safe_div(n, d) -> np.ndarray:
+    """Elementwise division on float arrays; any array/scalar combo broadcasts.
+    Returns NaN wherever the result is not finite (/0, inf, NaN inputs).
+    """
+    n = np.asarray(n, dtype=float)
+    d = np.asarray(d, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.true_divide(n, d)
+    return np.where(np.isfinite(out), out, np.nan)
+
+
+# ========================= Ratio Computation =========================
+
+def ratio_kernel(rev, ni, ebit, int_exp, cogs, gross_profit,
+                 cur_assets, cur_liab, cash_sti, inventory, receivables, payables,
+                 total_assets, total_debt, total_equity):
+    """Pure-array ratio math on year-aligned float64 inputs.
+    Returns (profitability, liquidity, leverage, efficiency) as dicts of column -> array.
+    """
     avg_assets = avg_series(total_assets)
     avg_inventory = avg_series(inventory)
     avg_receivables = avg_series(receivables)
@@ -119,48 +174,168 @@ def compute_ratios(inc: pd.DataFrame, bal: pd.DataFrame):
     avg_equity = avg_series(total_equity)
 
     # Profitability
-    profitability = pd.DataFrame({
+    profitability = {
         'Gross Margin': safe_div(gross_profit, rev),
         'EBIT Margin': safe_div(ebit, rev),
         'Net Profit Margin': safe_div(ni, rev),
         'ROA': safe_div(ni, avg_assets),
         'ROE': safe_div(ni, avg_equity),  # average equity for ROE
         'Asset Turnover': safe_div(rev, avg_assets),
-    }, index=years)
+    }
 
     # Liquidity
     quick_assets = cur_assets - inventory
-    liquidity = pd.DataFrame({
+    liquidity = {
         'Current Ratio': safe_div(cur_assets, cur_liab),
         'Quick Ratio': safe_div(quick_assets, cur_liab),
         'Cash Ratio': safe_div(cash_sti, cur_liab),
         'Working Capital (₹)': (cur_assets - cur_liab),
-    }, index=years)
+    }
 
     # Leverage / Coverage
-    leverage = pd.DataFrame({
+    leverage = {
         'Debt to Assets': safe_div(total_debt, total_assets),
         'Debt to Equity': safe_div(total_debt, total_equity),
-        'Interest Coverage': safe_div(ebit, int_exp.abs()),
-    }, index=years)
+        'Interest Coverage': safe_div(ebit, np.abs(int_exp)),
+    }
 
     # Efficiency / Activity
-    dio = safe_div(365, safe_div(cogs, avg_inventory))
-    dso = safe_div(365, safe_div(rev, avg_receivables))
-    dpo = safe_div(365, safe_div(cogs, avg_payables))
-    efficiency = pd.DataFrame({
-        'Inventory Turnover': safe_div(cogs, avg_inventory),
-        'Receivables Turnover': safe_div(rev, avg_receivables),
-        'Payables Turnover': safe_div(cogs, avg_payables),
+    inv_turn = safe_div(cogs, avg_inventory)
+    rec_turn = safe_div(rev, avg_receivables)
+    pay_turn = safe_div(cogs, avg_payables)
+    dio = safe_div(365, inv_turn)
+    dso = safe_div(365, rec_turn)
+    dpo = safe_div(365, pay_turn)
+    efficiency = {
+        'Inventory Turnover': inv_turn,
+        'Receivables Turnover': rec_turn,
+        'Payables Turnover': pay_turn,
         'Days Inventory Outstanding': dio,
         'Days Sales Outstanding': dso,
         'Days Payables Outstanding': dpo,
         'Cash Conversion Cycle (days)': dio + dso - dpo,
-    }, index=years)
+    }
 
     return profitability, liquidity, leverage, efficiency
 
 
+def compute_ratios(inc: pd.DataFrame, bal: pd.DataFrame):
+    raw = {
+        # Income statement
+        'rev': sget(inc, 'Total Revenue'),
+        'ni': sget(inc, 'Net Income'),
+        'ebit': sget(inc, 'EBIT'),
+        'int_exp': sget(inc, 'Interest Expense'),
+        'cogs': sget(inc, 'Cost Of Revenue'),
+        'gross_profit': sget(inc, 'Gross Profit'),
+        # Balance sheet
+        'cur_assets': sget(bal, 'Current Assets'),
+        'cur_liab': sget(bal, 'Current Liabilities'),
+        'cash_sti': sget(bal, 'Cash Cash Equivalents And Short Term Investments'),
+        'inventory': sget(bal, 'Inventory'),
+        'receivables': sget(bal, 'Accounts Receivable'),
+        'payables': sget(bal, 'Accounts Payable'),
+        'total_assets': sget(bal, 'Total Assets'),
+        'total_debt': sget(bal, 'Total Debt'),
+        'total_equity': sget(bal, 'Total Equity Gross Minority Interest'),
+    }
+    if raw['receivables'].empty:
+        raw['receivables'] = sget(bal, 'Net Receivables')
+    if raw['total_equity'].empty and 'Total Equity' in bal.columns:
+        raw['total_equity'] = sget(bal, 'Total Equity')
+    if raw['total_equity'].empty and 'Total Stockholder Equity' in bal.columns:
+        raw['total_equity'] = sget(bal, 'Total Stockholder Equity')
+
+    # Common aligned index across statements
+    years = np.unique(np.concatenate([
+        raw[k].index.to_numpy(dtype=int)
+        for k in ('rev', 'ni', 'ebit', 'cur_assets', 'cur_liab', 'total_assets', 'total_equity')
+    ]))
+
+    # Align every series to `years` in one pass; the kernel then works on plain float64 arrays
+    aligned = pd.concat(raw, axis=1).reindex(index=years).astype(float)
+    tables = ratio_kernel(**{k: aligned[k].to_numpy() for k in raw})
+    return tuple(pd.DataFrame(cols, index=years) for cols in tables)
+
+
+@st.cache_data(ttl=60 * 30)
+def get_ratios(ticker: str):
+    inc, bal, _ = load_statements(ticker)
+    return compute_ratios(inc, bal)
+
+
+@st.cache_data(ttl=60 * 30)
+def make_csv(ticker: str, yr_lo=None, yr_hi=None) -> bytes:
+    """All four ratio tables for the selected years as one CSV."""
+    profitability, liquidity, leverage, efficiency = get_ratios(ticker)
+    # All four frames share the same Year index, so one concat lines them up without re-joining
+    combined = pd.concat({
+        'Profitability': profitability,
+        'Liquidity': liquidity,
+        'Leverage': leverage,
+        'Efficiency': efficiency,
+    }, axis=1).loc[yr_lo:yr_hi]
+    combined.columns = [f"{group}: {name}" for group, name in combined.columns]
+    return combined.to_csv(index=True).encode()
+
+
+@st.cache_data(ttl=60 * 30)
+def get_market_df(ticker: str):
+    """Market ratios for the latest period. Errors propagate to the caller so they are not cached."""
+    inc, bal, _ = load_statements(ticker)
+    fast_info, hist, dividends = load_market(ticker)
+    price = fast_info.get('last_price')
+    if price is None or (isinstance(price, float) and np.isnan(price)):
+        price = fast_info.get('last_close')
+    if price is None or (isinstance(price, float) and np.isnan(price)):
+        price = float(hist['Close'].dropna().iloc[-1]) if not hist.empty else np.nan
+
+    shares_out = sget(bal, 'Share Issued')
+    if shares_out.empty:
+        shares_out = sget(bal, 'Ordinary Shares Number')
+    latest_year = shares_out.dropna().index.max() if not shares_out.empty else None
+
+    market_cap = fast_info.get('market_cap')
+    if (market_cap is None or (isinstance(market_cap, float) and np.isnan(market_cap))) and latest_year:
+        market_cap = price * float(shares_out.loc[latest_year])
+
+    eps = sget(inc, 'Basic EPS')
+    if eps.empty:
+        eps = sget(inc, 'Diluted EPS')
+    latest_eps = float(eps.dropna().iloc[-1]) if not eps.empty else np.nan
+    pe = np.nan if (latest_eps is None or np.isnan(latest_eps) or latest_eps <= 0) else (price / latest_eps)
+
+    book_equity = sget(bal, 'Total Equity Gross Minority Interest')
+    if book_equity.empty and 'Total Equity' in bal.columns:
+        book_equity = sget(bal, 'Total Equity')
+    if book_equity.empty and 'Total Stockholder Equity' in bal.columns:
+        book_equity = sget(bal, 'Total Stockholder Equity')
+    book_value_per_share = (
+        (book_equity.iloc[-1] / shares_out.iloc[-1])
+        if (not book_equity.empty and not shares_out.empty and shares_out.iloc[-1] != 0)
+        else np.nan
+    )
+    pb = np.nan if (book_value_per_share is None or isinstance(book_value_per_share, float) and np.isnan(book_value_per_share) or book_value_per_share == 0) else (price / book_value_per_share)
+
+    trailing_div = float(dividends.tail(4).sum()) if dividends is not None and not dividends.empty else np.nan
+    dividend_yield = np.nan if (price is None or (isinstance(price, float) and (np.isnan(price) or price == 0))) else (trailing_div / price)
+
+    market_rows = [
+        ('Price', price),
+        ('Market Cap', market_cap),
+        ('EPS (latest FY)', latest_eps),
+        ('P/E', pe),
+        ('Book Value/Share', book_value_per_share),
+        ('P/B', pb),
+        ('Trailing 12m Dividends', trailing_div),
+        ('Dividend Yield', dividend_yield),
+    ]
+    # One float64 column keyed by metric name: no object-dtype label column, None -> NaN
+    labels, values = zip(*market_rows)
+    market_df = pd.DataFrame({'Value': np.array(values, dtype=float)}, index=pd.Index(labels, name='Metric'))
+    return market_df
+
+
 # ========================= UI =========================
 
 st.title("📊 Financial Ratio Analyzer")
@@ -177,18 +352,19 @@ with colC:
 if ticker:
     with st.spinner("Loading financials..."):
         inc, bal, cfs = load_statements(ticker)
-        t = get_ticker(ticker)
 
     if inc.empty or bal.empty:
         st.error("Could not load sufficient financial data for this ticker.")
         st.stop()
 
-    profitability, liquidity, leverage, efficiency = compute_ratios(inc, bal)
+    profitability, liquidity, leverage, efficiency = get_ratios(ticker)
 
     # Year range filter to reduce chart/render load
-    all_years = sorted(set(profitability.index) | set(liquidity.index) | set(leverage.index) | set(efficiency.index))
-    if all_years:
-        yr_min, yr_max = int(min(all_years)), int(max(all_years))
+    # compute_ratios builds all four frames on the same sorted Year index
+    all_years = profitability.index.to_numpy()
+    sel = (None, None)
+    if len(all_years):
+        yr_min, yr_max = int(all_years[0]), int(all_years[-1])
         default_start = max(yr_min, yr_max - 5)
         sel = st.slider("Year range", min_value=yr_min, max_value=yr_max, value=(default_start, yr_max))
         slc = slice(sel[0], sel[1])
@@ -201,48 +377,7 @@ if ticker:
     market_df = pd.DataFrame()
     if show_market:
         try:
-            price = t.fast_info.get('last_price')
-            if price is None or (isinstance(price, float) and np.isnan(price)):
-                price = t.fast_info.get('last_close')
-            if price is None or (isinstance(price, float) and np.isnan(price)):
-                hist = t.history(period='5d')
-                price = float(hist['Close'].dropna().iloc[-1]) if not hist.empty else np.nan
-
-            shares_out = sget(bal, 'Share Issued')
-            if shares_out.empty:
-                shares_out = sget(bal, 'Ordinary Shares Number')
-            latest_year = shares_out.dropna().index.max() if not shares_out.empty else None
-
-            market_cap = t.fast_info.get('market_cap')
-            if (market_cap is None or (isinstance(market_cap, float) and np.isnan(market_cap))) and latest_year:
-                market_cap = price * float(shares_out.loc[latest_year])
-
-            eps = sget(inc, 'Basic EPS')
-            if eps.empty:
-                eps = sget(inc, 'Diluted EPS')
-            latest_eps = float(eps.dropna().iloc[-1]) if not eps.empty else np.nan
-            pe = np.nan if (latest_eps is None or np.isnan(latest_eps) or latest_eps <= 0) else (price / latest_eps)
-
-            book_equity = sget(bal, 'Total Equity Gross Minority Interest')
-            if book_equity.empty and 'Total Equity' in bal.columns:
-                book_equity = sget(bal, 'Total Equity')
-            if book_equity.empty and 'Total Stockholder Equity' in bal.columns:
-                book_equity = sget(bal, 'Total Stockholder Equity')
-            book_value_per_share = (
-                (book_equity.iloc[-1] / shares_out.iloc[-1])
-                if (not book_equity.empty and not shares_out.empty and shares_out.iloc[-1] != 0)
-                else np.nan
-            )
-            pb = np.nan if (book_value_per_share is None or isinstance(book_value_per_share, float) and np.isnan(book_value_per_share) or book_value_per_share == 0) else (price / book_value_per_share)
-
-            dividends = t.dividends
-            trailing_div = float(dividends.tail(4).sum()) if dividends is not None and not dividends.empty else np.nan
-            dividend_yield = np.nan if (price is None or (isinstance(price, float) and (np.isnan(price) or price == 0))) else (trailing_div / price)
-
-            market_df = pd.DataFrame({
-                'Metric': ['Price', 'Market Cap', 'EPS (latest FY)', 'P/E', 'Book Value/Share', 'P/B', 'Trailing 12m Dividends', 'Dividend Yield'],
-                'Value': [price, market_cap, latest_eps, pe, book_value_per_share, pb, trailing_div, dividend_yield]
-            })
+            market_df = get_market_df(ticker)
         except Exception as e:
             st.info(f"Market ratio data incomplete: {e}")
 
@@ -251,50 +386,59 @@ if ticker:
 
     tabs = st.tabs(["Profitability", "Liquidity", "Leverage", "Efficiency", "Market (opt)", "Raw Data"]) 
 
-    def fmt_df(df: pd.DataFrame, pct_cols=None, ratio_cols=None, int_cols=None):
-        df_disp = df.copy()
-        pct_cols = pct_cols or []
-        ratio_cols = ratio_cols or []
-        int_cols = int_cols or []
-        for c in df_disp.columns:
+    def style_df(df: pd.DataFrame, pct_cols=None, int_cols=None):
+        # Send floats to the frontend (compact Arrow columns) and format them at render time
+        pct_cols = set(pct_cols or [])
+        int_cols = set(int_cols or [])
+        fmt = {}
+        for c in df.columns:
             if c in pct_cols:
-                df_disp[c] = (df_disp[c] * 100).map(lambda x: f"{x:.{digits}f}%" if pd.notna(x) else "")
+                fmt[c] = f"{{:.{digits}%}}"
             elif c in int_cols:
-                df_disp[c] = df_disp[c].map(lambda x: f"{x:,.0f}" if pd.notna(x) else "")
+                fmt[c] = "{:,.0f}"
             else:
-                df_disp[c] = df_disp[c].map(lambda x: f"{x:.{digits}f}" if pd.notna(x) else "")
-        return df_disp
+                fmt[c] = f"{{:.{digits}f}}"
+        return df.style.format(fmt, na_rep="")
+
+    def chart_df(df: pd.DataFrame) -> pd.DataFrame:
+        # Charts can't show sub-basis-point detail; round so tooltips don't show noise digits
+        return df.round(4)
 
     with tabs[0]:
         st.write("### Profitability Ratios")
-        st.dataframe(fmt_df(profitability, pct_cols=['Gross Margin','EBIT Margin','Net Profit Margin','ROA'], ratio_cols=['Asset Turnover']))
+        st.dataframe(style_df(profitability, pct_cols=['Gross Margin','EBIT Margin','Net Profit Margin','ROA','ROE']))
         st.write("#### Trend")
-        st.line_chart(profitability[['Gross Margin','EBIT Margin','Net Profit Margin']])
+        st.line_chart(chart_df(profitability[['Gross Margin','EBIT Margin','Net Profit Margin']]))
 
     with tabs[1]:
         st.write("### Liquidity Ratios")
-        st.dataframe(fmt_df(liquidity, pct_cols=[], int_cols=['Working Capital (₹)']))
+        st.dataframe(style_df(liquidity, int_cols=['Working Capital (₹)']))
         st.write("#### Trend")
-        st.line_chart(liquidity[['Current Ratio','Quick Ratio','Cash Ratio']])
+        st.line_chart(chart_df(liquidity[['Current Ratio','Quick Ratio','Cash Ratio']]))
 
     with tabs[2]:
         st.write("### Leverage & Coverage")
-        st.dataframe(fmt_df(leverage))
+        st.dataframe(style_df(leverage))
         st.write("#### Trend")
-        st.line_chart(leverage[['Debt to Assets','Debt to Equity','Interest Coverage']])
+        st.line_chart(chart_df(leverage[['Debt to Assets','Debt to Equity','Interest Coverage']]))
 
     with tabs[3]:
         st.write("### Efficiency / Activity")
-        eff_disp = efficiency.copy()
-        st.dataframe(fmt_df(eff_disp))
+        st.dataframe(style_df(efficiency))
         st.write("#### Trend (CCC)")
-        if 'Cash Conversion Cycle (days)' in eff_disp.columns:
-            st.line_chart(eff_disp[['Cash Conversion Cycle (days)']])
+        if 'Cash Conversion Cycle (days)' in efficiency.columns:
+            st.line_chart(chart_df(efficiency[['Cash Conversion Cycle (days)']]))
 
     with tabs[4]:
         st.write("### Market Ratios (Optional)")
         if not market_df.empty:
-            st.dataframe(market_df)
+            # One Value column holds mixed units, so format per metric row
+            st.dataframe(
+                market_df.style
+                .format(f"{{:,.{digits}f}}", na_rep="")
+                .format("{:,.0f}", subset=pd.IndexSlice[['Market Cap'], 'Value'], na_rep="")
+                .format(f"{{:.{digits}%}}", subset=pd.IndexSlice[['Dividend Yield'], 'Value'], na_rep="")
+            )
         else:
             st.info("Market data not available for this ticker or period.")
 
@@ -314,13 +458,7 @@ if ticker:
     # ------------------ Download ------------------
     st.divider()
     st.write("### Download Ratios")
-    combined = (
-        profitability.add_prefix('Profitability: ')
-        .join(liquidity.add_prefix('Liquidity: '), how='outer')
-        .join(leverage.add_prefix('Leverage: '), how='outer')
-        .join(efficiency.add_prefix('Efficiency: '), how='outer')
-    )
-    csv = combined.to_csv(index=True)
+    csv = make_csv(ticker, *sel)
     st.download_button("Download CSV", data=csv, file_name=f"{ticker}_ratios.csv", mime="text/csv")
 
     st.caption("Notes: ROE uses average book equity; Interest Coverage uses |Interest Expense|; turnover ratios use average balances; values depend on statement availability.")
\ No newline at end of file